@@ -1,18 +1,27 @@
 """Auth endpoints — face-only registration, face login, token refresh, profile."""
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, status
-from sqlalchemy.orm import Session
+import cv2
+import numpy as np
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Request, status,
+)
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, defer
 
+from app.core import cache
 from app.core.database import get_db
 from app.core.security import (
     create_access_token, create_refresh_token,
-    decode_refresh_token, get_current_user,
+    decode_refresh_token, get_current_user, invalidate_auth_cache,
 )
 from app.core.config import settings
 from app.models.user import User, AuthAttempt
 from app.schemas.user import (
     UserOut, TokenPair, FaceVerifyResponse, RefreshRequest, MessageResponse,
 )
+from app.services import attempt_log
 from app.services import face_recognition as fr
 from app.services import liveness as lv
 
@@ -36,18 +45,19 @@ async def register_face(
         raise HTTPException(status_code=422, detail="Name must be 2–100 characters")
     if len(phone_number) < 6:
         raise HTTPException(status_code=422, detail="Invalid phone number")
-    if db.query(User).filter(User.name == name).first():
+    if db.scalar(select(User.id).where(User.name == name)) is not None:
         raise HTTPException(status_code=409, detail="Name already taken")
 
-    img_bytes = await face_image.read()
-    if len(img_bytes) > settings.MAX_UPLOAD_MB * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="Image too large")
+    img_bytes = await _read_upload(face_image)
 
-    live = lv.check_liveness_single(img_bytes)
+    # OpenCV / ONNX work is CPU-bound — run it off the event loop
+    # Decode once and share the BGR array between liveness and embedding
+    img = await asyncio.to_thread(_decode, img_bytes)
+    live = await asyncio.to_thread(lv.check_liveness_single, img)
     if not live.passed:
         raise HTTPException(status_code=422, detail=f"Liveness failed: {live.reason}")
 
-    embedding = fr.extract_embedding(img_bytes)
+    embedding = await asyncio.to_thread(fr.extract_embedding, img)
     if embedding is None:
         raise HTTPException(status_code=422, detail="No face detected in image")
 
@@ -58,8 +68,8 @@ async def register_face(
         face_enrolled=True,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.commit()   # id / created_at are populated by the flush — no refresh needed
+    await cache.set_embedding(name, user.id, embedding)
 
     return FaceVerifyResponse(
         access_token=create_access_token(user.id),
@@ -75,40 +85,59 @@ async def register_face(
 @router.post("/login/face", response_model=FaceVerifyResponse)
 async def login_face(
     request: Request,
+    background: BackgroundTasks,
     name: str = Form(...),
     face_frames: list[UploadFile] = File(..., description="Sequential JPEG frames"),
     db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.name == name).first()
-    if not user or not user.face_enrolled or user.face_embedding is None:
-        _log_attempt(db, None, False, None, False, request)
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-
-    frames_bytes = [await f.read() for f in face_frames]
-
-    live_result = lv.check_liveness_sequence(frames_bytes)
+    # Attempts are queued after the response is sent and batch-written by
+    # attempt_log. Failures are returned (not raised) so FastAPI still
+    # attaches the background tasks to them.
+    # A cache hit is an enrolled user — SQLite isn't touched until the match
+    # is persisted
+    cached = await cache.get_embedding(name)
+    if cached is not None:
+        user_id, stored = cached
+    else:
+        row = db.execute(
+            select(User.id, User.face_enrolled, User.face_embedding).where(User.name == name)
+        ).first()
+        if row is None or not row.face_enrolled or row.face_embedding is None:
+            _log_attempt(background, None, False, None, False, request)
+            return _error(401, "Invalid credentials")
+        user_id, stored = row.id, row.face_embedding
+        await cache.set_embedding(name, user_id, stored)
+
+    # At most two raw frames are buffered at once; each is dropped after decode
+    slots = asyncio.Semaphore(2)
+    frames = await asyncio.gather(*[_read_and_decode(f, slots) for f in face_frames])
+
+    live_result = await asyncio.to_thread(lv.check_liveness_sequence, frames)
     if not live_result.passed:
-        _log_attempt(db, user.id, False, None, False, request)
-        raise HTTPException(
-            status_code=401,
-            detail=f"Liveness failed: {live_result.reason}",
-        )
-
-    mid_frame = frames_bytes[len(frames_bytes) // 2]
-    new_embedding = fr.extract_embedding(mid_frame)
+        _log_attempt(background, user_id, False, None, False, request)
+        return _error(401, f"Liveness failed: {live_result.reason}")
+
+    # Align from liveness's YuNet detections (sharp frames only) — no re-detect
+    new_embedding = await asyncio.to_thread(fr.extract_embeddings_batch, live_result.detections)
     if new_embedding is None:
-        _log_attempt(db, user.id, False, None, True, request)
-        raise HTTPException(status_code=422, detail="Could not detect face in frames")
+        _log_attempt(background, user_id, False, None, True, request)
+        return _error(422, "Could not detect face in frames")
 
-    is_match, similarity = fr.verify_face(new_embedding, user.face_embedding)
-    _log_attempt(db, user.id, is_match, similarity, True, request)
+    is_match, similarity, updated = await asyncio.to_thread(
+        fr.verify_and_update, new_embedding, stored,
+    )
+    _log_attempt(background, user_id, is_match, similarity, True, request)
 
     if not is_match:
-        raise HTTPException(status_code=401, detail="Face does not match")
+        return _error(401, "Face does not match")
 
-    # Adaptive embedding update
-    user.face_embedding = fr.adaptive_update(user.face_embedding, new_embedding)
+    # Persist the adaptively-updated embedding — only now hydrate the full User
+    user = db.get(User, user_id, options=[defer(User.face_embedding)])
+    if user is None:   # deleted while its cache entry was still live
+        return _error(401, "Invalid credentials")
+    user.face_embedding = updated
     db.commit()
+    await cache.set_embedding(name, user_id, updated)
 
     return FaceVerifyResponse(
         access_token=create_access_token(user.id),
@@ -138,31 +167,62 @@ def refresh_tokens(body: RefreshRequest, db: Session = Depends(get_db)):
 # ── Profile ───────────────────────────────────────────────────────────────────
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: UserOut = Depends(get_current_user)):
     return current_user
 
 
 # ── Admin: clear database ─────────────────────────────────────────────────────
 
 @router.delete("/admin/clear", status_code=200)
-def clear_database(db: Session = Depends(get_db)):
+async def clear_database(db: Session = Depends(get_db)):
     """Delete all users and auth attempts. Dev/admin use only."""
-    db.query(AuthAttempt).delete()
-    db.query(User).delete()
+    db.execute(delete(AuthAttempt))
+    db.execute(delete(User))
     db.commit()
+    invalidate_auth_cache()
+    await cache.clear_embeddings()
     logger.warning("Database cleared via admin endpoint")
     return {"detail": "Database cleared"}
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _log_attempt(db, user_id, success, similarity, liveness_passed, request):
+_READ_CHUNK = 256 * 1024
+
+
+async def _read_upload(upload: UploadFile) -> bytearray:
+    """Read an upload in chunks, aborting with 413 as soon as it exceeds MAX_UPLOAD_MB."""
+    limit = settings.MAX_UPLOAD_MB * 1024 * 1024
+    if upload.size is not None and upload.size > limit:
+        raise HTTPException(status_code=413, detail="Image too large")
+    buf = bytearray()
+    while chunk := await upload.read(_READ_CHUNK):
+        buf += chunk
+        if len(buf) > limit:
+            raise HTTPException(status_code=413, detail="Image too large")
+    return buf
+
+
+def _decode(image_bytes: bytes | bytearray) -> np.ndarray | None:
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+
+async def _read_and_decode(upload: UploadFile, slots: asyncio.Semaphore) -> np.ndarray | None:
+    async with slots:
+        data = await _read_upload(upload)
+        return await asyncio.to_thread(_decode, data)
+
+
+def _error(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"detail": detail})
+
+
+def _log_attempt(background, user_id, success, similarity, liveness_passed, request):
     ip = request.client.host if request.client else None
-    db.add(AuthAttempt(
+    background.add_task(attempt_log.log_attempt, AuthAttempt(
         user_id=user_id,
         success=success,
         similarity_score=str(round(similarity, 4)) if similarity is not None else None,
         liveness_passed=liveness_passed,
         ip_address=ip,
     ))
-    db.commit()
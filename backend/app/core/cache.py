@@ -0,0 +1,76 @@
+"""
+Optional Redis cache for enrolled users' face embeddings.
+
+Keeps `face:<name>` → user id (int64, little-endian) + raw float32 embedding
+bytes so a repeat login needs nothing from the database until the match is
+persisted. Only enrolled users are cached — a hit means face_enrolled is
+true. Enabled only when REDIS_URL is set;
+every helper is a no-op otherwise. Redis errors are logged and treated
+as cache misses — the database stays the source of truth.
+"""
+import logging
+import struct
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None   # redis.asyncio.Redis
+
+_ID = struct.Struct("<q")
+
+
+def _key(name: str) -> str:
+    return f"face:{name}"
+
+
+async def connect() -> None:
+    global _redis
+    if not settings.REDIS_URL:
+        return
+    import redis.asyncio as aioredis
+    _redis = aioredis.from_url(settings.REDIS_URL)
+    logger.info("Embedding cache enabled (%s)", settings.REDIS_URL)
+
+
+async def close() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def get_embedding(name: str) -> Optional[tuple[int, bytes]]:
+    """(user_id, embedding) of an enrolled user, or None on a miss."""
+    if _redis is None:
+        return None
+    try:
+        value = await _redis.get(_key(name))
+    except Exception as e:
+        logger.warning("Embedding cache read failed: %s", e)
+        return None
+    if value is None:
+        return None
+    return _ID.unpack_from(value)[0], value[_ID.size:]
+
+
+async def set_embedding(name: str, user_id: int, embedding: bytes) -> None:
+    if _redis is None:
+        return
+    try:
+        value = _ID.pack(user_id) + embedding
+        await _redis.set(_key(name), value, ex=settings.EMBEDDING_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Embedding cache write failed: %s", e)
+
+
+async def clear_embeddings() -> None:
+    if _redis is None:
+        return
+    try:
+        keys = [k async for k in _redis.scan_iter(match=_key("*"))]
+        if keys:
+            await _redis.delete(*keys)
+    except Exception as e:
+        logger.warning("Embedding cache clear failed: %s", e)
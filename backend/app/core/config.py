@@ -21,6 +21,21 @@ class Settings(BaseSettings):
     # SFace cosine similarity: same person ≥ 0.593 (OpenCV recommended threshold)
     SIMILARITY_THRESHOLD: float = 0.593
     ADAPTIVE_ALPHA: float = 0.05         # Embedding update blend weight
+    # Opt-in INT8 SFace, built by download_models.py when set (needs onnx) —
+    # benchmark it and re-validate SIMILARITY_THRESHOLD (calibrated on FP32
+    # SFace) before enabling
+    SFACE_INT8: bool = False
+    # Install models whose SHA-256 can't be established (no pin, LFS pointer
+    # or release digest) — off by default; download_models.py refuses them
+    ALLOW_UNVERIFIED_MODELS: bool = False
+
+    # CPU threading — 0 = one thread per core
+    ORT_INTRA_OP_THREADS: int = 0        # ONNXRuntime intra-op pool (SFace, MiDaS)
+    CV_THREADS: int = 0                  # OpenCV's internal parallel_for pool
+
+    # Redis embedding cache — disabled when empty, e.g. redis://localhost:6379/0
+    REDIS_URL: str = ""
+    EMBEDDING_CACHE_TTL: int = 300       # seconds
 
     # Uploads
     UPLOAD_DIR: str = "./uploads"
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine
+import json
+
+import numpy as np
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.core.config import settings
 
@@ -7,7 +10,23 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # WAL lets readers run during writes; NORMAL skips the fsync per commit
+        # (still durable at checkpoints, safe against app crashes)
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        # Serve reads (incl. embedding BLOBs) from a 256 MB memory map and a
+        # ~20 MB page cache instead of read() syscalls into private buffers
+        cur.execute("PRAGMA mmap_size=268435456")
+        cur.execute("PRAGMA cache_size=-20000")
+        cur.close()
+
+
+# expire_on_commit=False: objects stay usable after commit without a reload SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 class Base(DeclarativeBase):
@@ -25,3 +44,38 @@ def get_db():
 def init_db():
     from app.models import user  # noqa: F401 — register models
     Base.metadata.create_all(bind=engine)
+    _create_missing_indexes()
+    _migrate_json_embeddings()
+
+
+def _create_missing_indexes():
+    """
+    create_all() skips tables that already exist — and with them any index
+    added to the model since, such as ix_attempts_user_time. Create those on
+    upgraded databases; checkfirst makes this a no-op once they exist.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _migrate_json_embeddings():
+    """
+    One-time upgrade of embeddings stored by older versions as JSON float
+    lists into float32 BLOBs. create_all() leaves existing tables alone, so
+    rows written before the switch are converted here on startup; rows that
+    are already binary are skipped, making this a no-op afterwards.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text("SELECT id, face_embedding FROM users WHERE face_embedding IS NOT NULL")
+        ).all()
+        for user_id, value in rows:
+            if isinstance(value, str):
+                value = json.loads(value)
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                continue  # already a float32 blob
+            conn.execute(
+                text("UPDATE users SET face_embedding = :emb WHERE id = :id"),
+                {"emb": np.asarray(value, dtype=np.float32).tobytes(), "id": user_id},
+            )
@@ -1,25 +1,24 @@
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+from cachetools import TTLCache
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from app.core.config import settings
 from app.core.database import get_db
+from app.schemas.user import UserOut
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer()
 
-
-# ── Password ──────────────────────────────────────────────────────────────────
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+# Short-lived caches for get_current_user — the same Bearer token is reused
+# across many requests within its lifetime, so skip HMAC + JSON + DB lookups.
+_cache_lock = threading.Lock()
+_payload_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)   # token digest → (user_id, exp)
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)      # user_id → UserOut (active users)
 
 
 # ── JWT ───────────────────────────────────────────────────────────────────────
@@ -47,13 +46,23 @@ def create_refresh_token(user_id: int) -> str:
 
 
 def decode_access_token(token: str) -> Optional[int]:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _cache_lock:
+        hit = _payload_cache.get(key)
+    if hit is not None:
+        user_id, exp = hit
+        return user_id if exp > time.time() else None
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if payload.get("type") != "access":
-            return None
-        return int(payload["sub"])
     except JWTError:
         return None
+    if payload.get("type") != "access":
+        return None
+    user_id = int(payload["sub"])
+    with _cache_lock:
+        _payload_cache[key] = (user_id, payload["exp"])
+    return user_id
 
 
 def decode_refresh_token(token: str) -> Optional[int]:
@@ -66,12 +75,23 @@ def decode_refresh_token(token: str) -> Optional[int]:
         return None
 
 
+def invalidate_auth_cache() -> None:
+    """Drop all cached token payloads and users (e.g. after users are deleted)."""
+    with _cache_lock:
+        _payload_cache.clear()
+        _user_cache.clear()
+
+
 # ── Dependency ────────────────────────────────────────────────────────────────
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
     db: Session = Depends(get_db),
-):
+) -> UserOut:
+    """
+    The authenticated user as a detached UserOut snapshot — cached instead of
+    the ORM instance, which stays bound to the session that loaded it.
+    """
     from app.models.user import User
 
     user_id = decode_access_token(credentials.credentials)
@@ -81,7 +101,15 @@ def get_current_user(
             detail="Invalid or expired access token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = db.get(User, user_id)
+    with _cache_lock:
+        snapshot = _user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    user = db.get(User, user_id, options=[defer(User.face_embedding)])
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    snapshot = UserOut.model_validate(user)
+    with _cache_lock:
+        _user_cache[user_id] = snapshot
+    return snapshot
@@ -1,14 +1,20 @@
 """FaceReg — Facial Recognition API"""
 import logging
+import time
+import cv2
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
+from app.core import cache
 from app.core.config import settings
 from app.core.database import init_db
 from app.api.v1.router import api_router
+from app.services import attempt_log, depth_check
+from app.services import face_recognition as fr
+from app.services import liveness as lv
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s — %(message)s")
 logger = logging.getLogger(__name__)
@@ -19,7 +25,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting FaceReg API…")
     init_db()
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    cv2.setNumThreads(settings.CV_THREADS or os.cpu_count() or 1)
+    t0 = time.perf_counter()
+    fr.warmup()
+    lv.warmup()
+    depth_check.warmup()
+    logger.info("Models loaded and warmed up in %.0f ms", (time.perf_counter() - t0) * 1000)
+    await cache.connect()
+    await attempt_log.start()
     yield
+    await attempt_log.stop()
+    await cache.close()
     logger.info("Shutting down FaceReg API…")
 
 
@@ -1,5 +1,5 @@
 from app.core.database import Base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary, Index
 from datetime import datetime, timezone
 
 
@@ -9,7 +9,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
     phone_number = Column(String(20), nullable=False)
-    face_embedding = Column(JSON, nullable=True)
+    face_embedding = Column(LargeBinary, nullable=True)  # 128 × float32 (512 B)
     face_enrolled = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -27,3 +27,6 @@ class AuthAttempt(Base):
     liveness_passed = Column(Boolean, nullable=True)
     ip_address = Column(String(45), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Serves per-user lookups and "user_id = ? AND created_at > ?" rate-limit scans
+    __table_args__ = (Index("ix_attempts_user_time", "user_id", "created_at"),)
@@ -0,0 +1,82 @@
+"""
+Batched writer for AuthAttempt rows.
+
+Login attempts are queued from request handlers and written by a single
+background task, in batches of up to BATCH_MAX rows or every
+FLUSH_INTERVAL seconds — one commit (and one fsync) per batch instead of
+one per login. Started/stopped from the app lifespan; if the writer isn't
+running (e.g. scripts without a lifespan), attempts are written directly.
+"""
+import asyncio
+import logging
+
+from app.core.database import SessionLocal
+from app.models.user import AuthAttempt
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX      = 50
+FLUSH_INTERVAL = 0.5   # seconds
+
+_queue: asyncio.Queue | None = None
+_task: asyncio.Task | None = None
+_STOP = object()
+
+
+async def start() -> None:
+    global _queue, _task
+    _queue = asyncio.Queue()
+    _task = asyncio.create_task(_writer(_queue))
+
+
+async def stop() -> None:
+    """Flush everything still queued, then stop the writer."""
+    global _queue, _task
+    if _task is None:
+        return
+    _queue.put_nowait(_STOP)
+    await _task
+    _queue = _task = None
+
+
+async def log_attempt(attempt: AuthAttempt) -> None:
+    if _queue is None:
+        await asyncio.to_thread(_flush, [attempt])
+        return
+    _queue.put_nowait(attempt)
+
+
+async def _writer(queue: asyncio.Queue) -> None:
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is _STOP:
+            break
+        batch = [item]
+        deadline = loop.time() + FLUSH_INTERVAL
+        while len(batch) < BATCH_MAX:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+        await asyncio.to_thread(_flush, batch)
+
+
+def _flush(batch: list[AuthAttempt]) -> None:
+    db = SessionLocal()
+    try:
+        db.bulk_save_objects(batch)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Failed to write %d auth attempt(s): %s", len(batch), e)
+    finally:
+        db.close()
@@ -20,12 +20,17 @@ import os
 import cv2
 import numpy as np
 import logging
+import threading
 from pathlib import Path
 
+from app.services.model_loader import create_session, run_bound
+
 logger = logging.getLogger(__name__)
 
+_lock = threading.Lock()
 _session = None
 _input_name: str | None = None
+_output_name: str | None = None
 
 MODELS_DIR = Path(__file__).resolve().parent.parent.parent / "models"
 MIDAS_PATH = MODELS_DIR / "midas_small.onnx"
@@ -34,21 +39,40 @@ MIDAS_PATH = MODELS_DIR / "midas_small.onnx"
 DEPTH_RANGE_MIN = 15.0   # real face > 15;  flat < 12
 DEPTH_STD_MIN   =  5.0   # real face > 5;   flat < 4
 
+# ImageNet normalisation folded into one affine step on 0-255 input, in BGR
+# channel order so the BGR→RGB swap happens during the final NCHW copy:
+#   (x / 255 - mean) / std  ==  (x - 255·mean) · 1 / (255·std)
+_MEAN_BGR = (255.0 * np.array([0.406, 0.456, 0.485], dtype=np.float32)).reshape(1, 1, 3)
+_INV_STD_BGR = (1.0 / (255.0 * np.array([0.225, 0.224, 0.229], dtype=np.float32))).reshape(1, 1, 3)
+
+# Per-thread preprocessing buffers — reused across calls instead of
+# allocating ~1 MB of temporaries per frame
+_scratch = threading.local()
+
+
+def _buffers() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if not hasattr(_scratch, "blob"):
+        _scratch.resized = np.empty((256, 256, 3), dtype=np.uint8)
+        _scratch.norm = np.empty((256, 256, 3), dtype=np.float32)
+        _scratch.blob = np.empty((1, 3, 256, 256), dtype=np.float32)
+    return _scratch.resized, _scratch.norm, _scratch.blob
+
 
 def _load():
-    global _session, _input_name
+    global _session, _input_name, _output_name
     if _session is not None:
         return
-    if not MIDAS_PATH.exists():
-        logger.warning("MiDaS model not found at %s — depth check disabled", MIDAS_PATH)
-        return
-    import onnxruntime as ort
-    _session = ort.InferenceSession(
-        str(MIDAS_PATH),
-        providers=["CPUExecutionProvider"],
-    )
-    _input_name = _session.get_inputs()[0].name
-    logger.info("MiDaS-small loaded (depth anti-spoof enabled)")
+    with _lock:
+        if _session is not None:
+            return
+        if not MIDAS_PATH.exists():
+            logger.warning("MiDaS model not found at %s — depth check disabled", MIDAS_PATH)
+            return
+        sess = create_session(MIDAS_PATH)
+        _input_name = sess.get_inputs()[0].name
+        _output_name = sess.get_outputs()[0].name
+        _session = sess
+        logger.info("MiDaS-small loaded (depth anti-spoof enabled)")
 
 
 def is_available() -> bool:
@@ -56,22 +80,26 @@ def is_available() -> bool:
     return _session is not None
 
 
+def warmup() -> None:
+    """Load MiDaS and run it once so ORT plans memory before the first login."""
+    if is_available():
+        estimate_depth(np.zeros((256, 256, 3), dtype=np.uint8))
+
+
 def estimate_depth(img_bgr: np.ndarray) -> np.ndarray | None:
     """Run MiDaS on a BGR image and return a (H, W) relative depth map."""
     _load()
     if _session is None:
         return None
 
-    # Preprocess: resize to 256×256, convert BGR→RGB, normalise, NCHW
-    rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    resized = cv2.resize(rgb, (256, 256)).astype(np.float32) / 255.0
-    # Standard ImageNet-ish normalisation
-    mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-    std  = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-    resized = (resized - mean) / std
-    blob = resized.transpose(2, 0, 1)[np.newaxis]  # (1, 3, 256, 256)
+    # Preprocess in place: resize to 256×256, normalise, BGR→RGB + NCHW
+    resized, norm, blob = _buffers()
+    cv2.resize(img_bgr, (256, 256), dst=resized)
+    np.subtract(resized, _MEAN_BGR, out=norm)
+    np.multiply(norm, _INV_STD_BGR, out=norm)
+    np.copyto(blob[0], norm[:, :, ::-1].transpose(2, 0, 1))  # (1, 3, 256, 256) RGB
 
-    out = _session.run(None, {_input_name: blob})[0]  # (1, 256, 256)
+    out = run_bound(_session, _input_name, _output_name, blob)  # (1, 256, 256)
     depth = out.squeeze()  # (256, 256)
     return depth
 
@@ -113,12 +141,14 @@ def check_depth(
     cy, cx = rh // 2, rw // 2
     margin_y, margin_x = max(rh // 6, 2), max(rw // 6, 2)
     center = roi[cy - margin_y : cy + margin_y, cx - margin_x : cx + margin_x]
+    # Border ring as four non-overlapping strips (corners counted once)
     edge_top    = roi[:margin_y, :]
     edge_bottom = roi[-margin_y:, :]
-    edge_left   = roi[:, :margin_x]
-    edge_right  = roi[:, -margin_x:]
-    edge_mean = np.mean([edge_top.mean(), edge_bottom.mean(),
-                         edge_left.mean(), edge_right.mean()])
+    middle      = roi[margin_y:-margin_y, :]
+    edge_left   = middle[:, :margin_x]
+    edge_right  = middle[:, -margin_x:]
+    edge_sum = edge_top.sum() + edge_bottom.sum() + edge_left.sum() + edge_right.sum()
+    edge_mean = edge_sum / (edge_top.size + edge_bottom.size + edge_left.size + edge_right.size)
     center_mean = center.mean()
     gradient = abs(float(center_mean - edge_mean))
 
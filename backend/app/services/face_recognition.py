@@ -2,13 +2,18 @@
 Face recognition service — OpenCV YuNet + SFace (no TensorFlow needed).
 
 Pipeline:
-  image bytes → YuNet face detection + 5-point alignment
-             → SFace ONNX embedding (128-d, L2-normalised)
+  decoded BGR image → YuNet face detection + 5-point alignment
+             → SFace ONNX embedding (128-d, L2-normalised, stored as float32 bytes)
              → cosine similarity → match / adaptive update
 
 Models (~37 MB total, bundled in backend/models/):
-  face_detection_yunet.onnx  — YuNet detector (228 KB)
-  face_recognition_sface.onnx — SFace recognizer (37 MB)
+  face_detection_yunet.onnx        — YuNet detector (228 KB)
+  face_recognition_sface.onnx      — SFace recognizer (37 MB, FP32)
+  face_recognition_sface_int8.onnx — SFace with INT8 dynamic-quantised FC
+                                     layers (download_models.py); used only
+                                     when SFACE_INT8 is enabled
+
+SFace runs directly on ONNXRuntime (tuned session options, IOBinding).
 """
 import cv2
 import numpy as np
@@ -18,28 +23,64 @@ from pathlib import Path
 from typing import Optional
 
 from app.core.config import settings
+from app.services.model_loader import create_session, run_bound
+
+try:
+    from numba import njit
+except ImportError:  # optional — NumPy fallback below
+    njit = None
 
 logger = logging.getLogger(__name__)
 
 MODELS_DIR = Path(__file__).parent.parent.parent / "models"
 YUNET_PATH  = MODELS_DIR / "face_detection_yunet.onnx"
 SFACE_PATH  = MODELS_DIR / "face_recognition_sface.onnx"
+SFACE_INT8_PATH = MODELS_DIR / "face_recognition_sface_int8.onnx"
+
+# 5-point reference landmarks of the 112×112 SFace input (eyes, nose, mouth corners)
+_SFACE_REF_POINTS = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32)
+
+# Frames are downscaled so their longest side is at most this before YuNet.
+# Phone uploads then map onto a handful of stable input sizes and the
+# detector's anchor grid is rebuilt only when the size actually changes.
+DETECT_MAX_SIDE = 640
 
 # ── Thread-safe lazy singletons ────────────────────────────────────────────────
 
-_lock     = threading.Lock()
-_detector = None   # cv2.FaceDetectorYN
-_recognizer = None # cv2.FaceRecognizerSF
+_lock    = threading.Lock()
+_session = None                 # onnxruntime.InferenceSession (SFace) — run() is thread-safe
+_local   = threading.local()    # per-thread cv2.FaceDetectorYN — setInputSize/detect are stateful
+
+
+def _get_detector():
+    det = getattr(_local, "detector", None)
+    if det is None:
+        det = cv2.FaceDetectorYN.create(
+            str(YUNET_PATH),
+            "",
+            (320, 320),
+            score_threshold=0.6,
+            nms_threshold=0.3,
+            top_k=1,
+        )
+        _local.detector = det
+    return det
 
 
 def _get_models():
-    global _detector, _recognizer
-    if _detector is not None:
-        return _detector, _recognizer
+    global _session
+    if _session is not None:
+        return _get_detector(), _session
 
     with _lock:
-        if _detector is not None:
-            return _detector, _recognizer
+        if _session is not None:
+            return _get_detector(), _session
 
         if not YUNET_PATH.exists():
             raise RuntimeError(
@@ -52,94 +93,315 @@ def _get_models():
                 "Run: python3 download_models.py"
             )
 
-        det = cv2.FaceDetectorYN.create(
-            str(YUNET_PATH),
-            "",
-            (320, 320),
-            score_threshold=0.6,
-            nms_threshold=0.3,
-            top_k=1,
+        sface_path = (
+            SFACE_INT8_PATH
+            if settings.SFACE_INT8 and SFACE_INT8_PATH.exists()
+            else SFACE_PATH
         )
-        rec = cv2.FaceRecognizerSF.create(str(SFACE_PATH), "")
-
-        _detector = det
-        _recognizer = rec
-        logger.info("YuNet + SFace models loaded from %s", MODELS_DIR)
-        return _detector, _recognizer
+        _session = create_session(sface_path)
+        logger.info("YuNet + SFace models loaded (%s)", sface_path.name)
+        return _get_detector(), _session
 
 
 # ── Internal helpers ───────────────────────────────────────────────────────────
 
-def _detect_and_align(detector, recognizer, img: np.ndarray) -> Optional[np.ndarray]:
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _cos128(a, b):
+        """Dot product of two L2-normalised embeddings (= cosine similarity)."""
+        s = 0.0
+        for i in range(a.shape[0]):
+            s += a[i] * b[i]
+        return s
+
+    @njit(cache=True, fastmath=True)
+    def _blend_normalise(stored, new, alpha, out):
+        """out = normalise((1 - alpha)·stored + alpha·new) — blend and norm fused."""
+        sq = 0.0
+        for i in range(out.shape[0]):
+            v = (1.0 - alpha) * stored[i] + alpha * new[i]
+            out[i] = v
+            sq += v * v
+        inv = 1.0 / np.sqrt(sq)
+        for i in range(out.shape[0]):
+            out[i] *= inv
+
+    @njit(cache=True, fastmath=True)
+    def _verify_blend(stored, new, alpha, threshold, out):
+        """
+        One sweep: cosine similarity, blended vector and its squared norm.
+        The blend is normalised only on a match. Returns the similarity.
+        """
+        dot = 0.0
+        sq = 0.0
+        for i in range(out.shape[0]):
+            a = stored[i]
+            b = new[i]
+            dot += a * b
+            v = (1.0 - alpha) * a + alpha * b
+            out[i] = v
+            sq += v * v
+        if dot >= threshold:
+            inv = 1.0 / np.sqrt(sq)
+            for i in range(out.shape[0]):
+                out[i] *= inv
+        return dot
+else:
+    def _cos128(a, b):
+        return np.dot(a, b)
+
+    def _blend_normalise(stored, new, alpha, out):
+        np.multiply(stored, 1.0 - alpha, out=out)
+        out += alpha * new
+        out /= np.linalg.norm(out)
+
+    def _verify_blend(stored, new, alpha, threshold, out):
+        dot = np.dot(stored, new)
+        if dot >= threshold:
+            _blend_normalise(stored, new, alpha, out)
+        return dot
+
+
+def _similarity_transform(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
     """
-    Detect the largest face with YuNet and return the aligned 112×112 crop
-    as expected by SFace. Returns None if no face is found.
+    Closed-form least-squares similarity (Umeyama) mapping src → dst, as a
+    2×3 matrix — the same estimate as OpenCV's getSimilarityTransformMatrix
+    behind FaceRecognizerSF.alignCrop, which SIMILARITY_THRESHOLD and stored
+    embeddings were produced with. Uses all 5 points (no outlier rejection).
+    """
+    src_mean, dst_mean = src.mean(axis=0), dst.mean(axis=0)
+    src_d, dst_d = src - src_mean, dst - dst_mean
+    A = dst_d.T @ src_d / len(src)
+    d = np.ones(2)
+    if np.linalg.det(A) < 0:
+        d[1] = -1
+    U, S, Vt = np.linalg.svd(A)
+    R = U @ np.diag(d) @ Vt
+    scale = (S * d).sum() / src_d.var(axis=0).sum()
+    M = np.empty((2, 3))
+    M[:, :2] = scale * R
+    M[:, 2] = dst_mean - M[:, :2] @ src_mean
+    return M
+
+
+def _align_crop(img: np.ndarray, face: np.ndarray) -> np.ndarray:
+    """Similarity-warp the face so its 5 landmarks hit the SFace reference points."""
+    landmarks = face[4:14].reshape(5, 2).astype(np.float64)
+    M = _similarity_transform(landmarks, _SFACE_REF_POINTS.astype(np.float64))
+    return cv2.warpAffine(img, M, (112, 112))
+
+
+def _detect(detector, img: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Run YuNet on a copy downscaled to DETECT_MAX_SIDE and return the face
+    rows (N, 15) in original-image coordinates, or None if none found.
     """
     h, w = img.shape[:2]
-    detector.setInputSize((w, h))
+    scale = min(1.0, DETECT_MAX_SIDE / max(h, w))
+    if scale < 1.0:
+        size = (max(int(w * scale), 1), max(int(h * scale), 1))
+        small = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    else:
+        size, small = (w, h), img
+
+    # setInputSize rebuilds YuNet's prior boxes — skip it when unchanged
+    if getattr(_local, "input_size", None) != size:
+        detector.setInputSize(size)
+        _local.input_size = size
 
-    _, faces = detector.detect(img)
+    _, faces = detector.detect(small)
     if faces is None or len(faces) == 0:
         return None
+    if scale < 1.0:
+        faces[:, :14] /= scale   # box + 5 landmarks back to full resolution
+    return faces
+
+
+def _detect_and_align(detector, img: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Detect the largest face with YuNet and return the aligned 112×112 crop
+    as expected by SFace. Returns None if no face is found.
+    """
+    faces = _detect(detector, img)
+    if faces is None:
+        return None
 
     # Use face with highest confidence
     face = faces[np.argmax(faces[:, -1])]
 
-    aligned = recognizer.alignCrop(img, face)  # returns (112, 112, 3) uint8
+    aligned = _align_crop(img, face)  # (112, 112, 3) uint8
     return aligned
 
 
+def _features(session, crops: list[np.ndarray]) -> np.ndarray:
+    """Run SFace on aligned 112×112 crops → (N, 128) L2-normalised float32."""
+    # Same preprocessing as cv2.FaceRecognizerSF: RGB, 0-255, NCHW
+    blob = cv2.dnn.blobFromImages(crops, 1.0, (112, 112), (0, 0, 0), swapRB=True)
+    inp, out = session.get_inputs()[0], session.get_outputs()[0].name
+    if inp.shape[0] == 1:   # exported with a fixed batch of 1
+        feats = np.vstack([run_bound(session, inp.name, out, blob[i : i + 1])
+                           for i in range(len(crops))])
+    else:
+        feats = run_bound(session, inp.name, out, blob)
+    feats = feats.reshape(len(crops), -1).astype(np.float32)
+    norms = np.linalg.norm(feats, axis=1, keepdims=True)
+    np.divide(feats, norms, out=feats, where=norms > 0)
+    return feats
+
+
 # ── Public API ─────────────────────────────────────────────────────────────────
 
-def extract_embedding(image_bytes: bytes) -> Optional[list[float]]:
+def extract_embedding(img: Optional[np.ndarray]) -> Optional[bytes]:
     """
-    Extract SFace embedding from raw image bytes.
-    Returns L2-normalised 128-d vector, or None if no face detected.
+    Extract SFace embedding from a decoded BGR image.
+    Returns L2-normalised 128-d float32 vector as raw bytes (512 B),
+    or None if no face detected.
     """
     try:
-        detector, recognizer = _get_models()
+        detector, session = _get_models()
     except RuntimeError as e:
         logger.error("Model load error: %s", e)
         return None
 
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
     if img is None:
         return None
 
-    aligned = _detect_and_align(detector, recognizer, img)
+    aligned = _detect_and_align(detector, img)
     if aligned is None:
         logger.debug("No face detected in image")
         return None
 
-    embedding = recognizer.feature(aligned)          # (1, 128) float32
-    embedding = embedding.flatten()                   # (128,)
-    norm = np.linalg.norm(embedding)
+    return _features(session, [aligned])[0].tobytes()
+
+
+def extract_embeddings_batch(
+    detections: list[tuple[np.ndarray, np.ndarray]],
+) -> Optional[bytes]:
+    """
+    Embed frames whose faces were already found by YuNet (liveness keeps the
+    (frame, face row) pairs) and average the results. Each frame is aligned
+    from its row — no second detection pass — then SFace runs once on the
+    stacked crops. Returns the re-normalised mean embedding as float32
+    bytes, or None if there were no detections.
+    """
+    try:
+        _, session = _get_models()
+    except RuntimeError as e:
+        logger.error("Model load error: %s", e)
+        return None
+
+    if not detections:
+        logger.debug("No face detected in any frame")
+        return None
+    crops = [_align_crop(img, face) for img, face in detections]
+
+    mean = _features(session, crops).mean(axis=0)
+    norm = np.linalg.norm(mean)
     if norm > 0:
-        embedding = embedding / norm
-    return embedding.tolist()
+        mean /= norm
+    return mean.tobytes()
+
+
+def detect_faces(img: np.ndarray) -> Optional[np.ndarray]:
+    """
+    YuNet detections for a decoded BGR image as (N, 15) rows
+    [x, y, w, h, 5 × (lx, ly), score] in image coordinates, or None.
+    Uses the calling thread's detector.
+    """
+    try:
+        detector, _ = _get_models()
+    except RuntimeError as e:
+        logger.error("Model load error: %s", e)
+        return None
+    return _detect(detector, img)
+
+
+def _as_vector(embedding: bytes) -> np.ndarray:
+    """Zero-copy float32 view over a stored embedding blob."""
+    return np.frombuffer(embedding, dtype=np.float32)
+
+
+def _same_length(new: np.ndarray, stored: np.ndarray) -> bool:
+    """The JIT kernels don't bounds-check — a mismatched pair is never a match."""
+    if new.shape == stored.shape:
+        return True
+    logger.error("Embedding length mismatch: new=%d stored=%d", new.size, stored.size)
+    return False
+
+
+def warmup() -> None:
+    """
+    Load YuNet + SFace, run each once on a blank input and compile the JIT
+    kernels, so the first login doesn't pay model load, ORT kernel
+    selection or Numba compilation.
+    """
+    # Go through the public bytes API so the kernels compile for the exact
+    # argument types seen at runtime — np.frombuffer views are read-only,
+    # and Numba specialises on that
+    dummy = np.full(128, 1 / np.sqrt(128), dtype=np.float32).tobytes()
+    verify_face(dummy, dummy)
+    adaptive_update(dummy, dummy)
+    verify_and_update(dummy, dummy)
+
+    try:
+        detector, session = _get_models()
+    except RuntimeError as e:
+        logger.warning("Skipping face model warm-up: %s", e)
+        return
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    _detect(detector, blank)
+    _features(session, [blank[:112, :112]])
 
 
 def verify_face(
-    new_embedding: list[float],
-    stored_embedding: list[float],
+    new_embedding: bytes,
+    stored_embedding: bytes,
 ) -> tuple[bool, float]:
     """Returns (is_match, cosine_similarity ∈ [-1, 1])."""
-    va = np.array(new_embedding)
-    vb = np.array(stored_embedding)
+    va = _as_vector(new_embedding)
+    vb = _as_vector(stored_embedding)
+    if not _same_length(va, vb):
+        return False, 0.0
     # Both L2-normalised → dot = cosine similarity
-    sim = float(np.dot(va, vb))
+    sim = float(_cos128(va, vb))
     return sim >= settings.SIMILARITY_THRESHOLD, sim
 
 
 def adaptive_update(
-    stored_embedding: list[float],
-    new_embedding: list[float],
+    stored_embedding: bytes,
+    new_embedding: bytes,
     alpha: float | None = None,
-) -> list[float]:
+) -> bytes:
     """Blend new embedding into stored with weight alpha (default 5%)."""
     if alpha is None:
         alpha = settings.ADAPTIVE_ALPHA
-    updated = (1 - alpha) * np.array(stored_embedding) + alpha * np.array(new_embedding)
-    updated /= np.linalg.norm(updated)
-    return updated.tolist()
+    stored, new = _as_vector(stored_embedding), _as_vector(new_embedding)
+    if stored.shape != new.shape:
+        raise ValueError(f"Embedding length mismatch: {stored.size} vs {new.size}")
+    updated = np.empty_like(stored)
+    _blend_normalise(stored, new, alpha, updated)
+    return updated.tobytes()
+
+
+def verify_and_update(
+    new_embedding: bytes,
+    stored_embedding: bytes,
+    alpha: float | None = None,
+) -> tuple[bool, float, Optional[bytes]]:
+    """
+    verify_face + adaptive_update in a single pass over the stored vector.
+    Returns (is_match, cosine_similarity, updated_embedding or None if no match).
+    """
+    if alpha is None:
+        alpha = settings.ADAPTIVE_ALPHA
+    stored = _as_vector(stored_embedding)
+    new = _as_vector(new_embedding)
+    if not _same_length(new, stored):
+        return False, 0.0, None
+    updated = np.empty_like(stored)
+    sim = float(_verify_blend(
+        stored, new, alpha, settings.SIMILARITY_THRESHOLD, updated,
+    ))
+    is_match = sim >= settings.SIMILARITY_THRESHOLD
+    return is_match, sim, updated.tobytes() if is_match else None
+
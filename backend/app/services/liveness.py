@@ -5,7 +5,7 @@ Blocks printed photos, screen-displayed photos, and video replay.
 
 Layers:
  1. Blur check (Laplacian variance) — rejects low-quality / printouts
- 2. Haar face detection — ensures a face is present
+ 2. YuNet face detection — ensures a face is present
  3. LBP texture entropy — real skin micro-texture vs screen/print
  4. Moiré detection (FFT high-freq ratio) — screen pixel-grid interference
  5. Skin chrominance variance (YCrCb Cr) — flat screen vs natural skin
@@ -13,11 +13,26 @@ Layers:
  7. Inter-frame motion — catches perfectly static replay
 
 For login (sequence), signals 3-6 use scoring: fail if ≥ 2 of 4 trigger.
+They are evaluated cheapest-first and stop as soon as the outcome is fixed.
 """
 import cv2
 import numpy as np
 import logging
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+try:
+    from numba import njit
+except ImportError:  # optional — NumPy fallback below
+    njit = None
+
+try:
+    import pyfftw
+except ImportError:  # optional — numpy.fft fallback below
+    pyfftw = None
+
+from app.services import face_recognition as fr
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +40,31 @@ logger = logging.getLogger(__name__)
 
 BLUR_MIN_SINGLE = 25       # enrollment — below = too blurry
 BLUR_MIN_SEQ    = 15       # per-frame in sequence — discard if below
-MOTION_AVG_MIN  = 0.8      # mean pixel diff — below = static replay
+MOTION_AVG_MIN  = 0.7      # mean pixel diff (face ROI, 4× decimated) — below = static replay
 LBP_ENTROPY_MIN = 4.5      # LBP histogram entropy — below = artificial texture
-MOIRE_RATIO_MAX = 0.96     # FFT high-freq energy ratio — above = screen moiré (phone cameras ~0.93-0.95)
+MOIRE_RATIO_MAX = 0.35     # FFT high-freq power ratio — above = screen moiré
 SKIN_CR_VAR_MIN = 8.0      # Cr channel variance — below = flat colour (screen)
 
+# MOIRE_RATIO_MAX was 0.96 on log(1 + |F|). On the raw power spectrum (DC
+# excluded) a flat spectrum — pure sensor noise — lands at ~0.957, so a
+# cut-off near it never fires. Retuned on 2000 genuine 128×128 crops (the
+# skimage astronaut / cameraman faces and 1/f textures, 128–320 px faces,
+# σ 1–8 noise, JPEG q70–95) against 2000 of the same crops overlaid with a
+# period 3–6 px display grid (10–40% contrast, random angle):
+#   genuine  p50 0.056  p99 0.279  max 0.340
+#   grid     p50 0.205  p95 0.562  max 0.692
+# 0.35 rejects no genuine crop and flags ~27% of grid frames on its own —
+# a supporting vote for the other signals, not a standalone screen detector.
+#
+# MOTION_AVG_MIN was 0.8 on the full-resolution frame, where sensor noise of
+# σ≈1 alone scored ~1.1. 4× area decimation cuts that noise floor ~4× while
+# keeping ~85% of genuine sub-pixel motion, so 0.7 ≈ the old 0.8 minus noise.
+
+# Per-frame prep (gray, blur, YuNet) for login sequences — OpenCV releases the
+# GIL, and YuNet detectors are per-thread (see face_recognition._get_detector)
+_POOL_WORKERS = 4
+_POOL = ThreadPoolExecutor(max_workers=_POOL_WORKERS, thread_name_prefix="liveness")
+
 
 @dataclass
 class LivenessResult:
@@ -37,73 +72,191 @@ class LivenessResult:
     reason: str
     blur_score: float = 0.0
     motion_score: float = 0.0
+    # Sequence only: (frame, YuNet row) for every usable frame with a face,
+    # so embedding can align from these instead of detecting again
+    detections: list[tuple[np.ndarray, np.ndarray]] = field(default_factory=list)
 
 
 # ── Low-level helpers ──────────────────────────────────────────────────────────
 
-def _decode(image_bytes: bytes):
-    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
-
-
 def _blur(gray: np.ndarray) -> float:
-    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    # 16-bit Laplacian holds the full ±1020 range of the 3×3 aperture on uint8
+    lap = cv2.Laplacian(gray, cv2.CV_16S)
+    _, std = cv2.meanStdDev(lap)
+    return float(std[0, 0] ** 2)
 
 
-def _cascade():
-    return cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
+def _find_face(img_bgr: np.ndarray):
+    """Return (x, y, w, h) of the largest face (YuNet, clipped to the image), or None."""
+    return _face_rect(fr.detect_faces(img_bgr), img_bgr.shape)
 
 
-def _find_face(cascade, gray):
-    """Return (x, y, w, h) of largest face, or None."""
-    faces = cascade.detectMultiScale(gray, 1.1, 5, minSize=(60, 60))
-    if len(faces) == 0:
+def _face_rect(faces: np.ndarray | None, shape: tuple):
+    """(x, y, w, h) of the largest of YuNet's face rows, clipped to the image, or None."""
+    if faces is None:
+        return None
+    x, y, w, h = faces[int(np.argmax(faces[:, 2] * faces[:, 3])), :4]
+    ih, iw = shape[:2]
+    x0, y0 = max(int(x), 0), max(int(y), 0)
+    x1, y1 = min(int(x + w), iw), min(int(y + h), ih)
+    if x1 <= x0 or y1 <= y0:
         return None
-    return tuple(faces[int(np.argmax([w * h for (x, y, w, h) in faces]))])
+    return (x0, y0, x1 - x0, y1 - y0)
 
 
 # ── Anti-spoof signals ─────────────────────────────────────────────────────────
 
-def _lbp_entropy(gray_face: np.ndarray) -> float:
+_MOIRE_SIZE = 128   # shared face crop side (moiré FFT runs on it directly)
+_LBP_SIZE   = 96    # LBP runs on a further downsample of the shared crop
+
+# BT.601 Cr row plus +128 offset, in BGR channel order (as cv2.COLOR_BGR2YCrCb)
+_CR_FROM_BGR = np.array([[-0.081312, -0.418688, 0.5, 128.0]], dtype=np.float32)
+
+# LBP neighbour offsets (dy, dx), clockwise from top-left; index = bit position
+_LBP_NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+# NumPy fallback: (row, col) slices of each neighbour window over the
+# _LBP_SIZE crop, aligned with the interior [1:-1, 1:-1]
+_LBP_WINDOWS = tuple(
+    (slice(1 + dy, _LBP_SIZE - 1 + dy), slice(1 + dx, _LBP_SIZE - 1 + dx))
+    for dy, dx in _LBP_NEIGHBOURS
+)
+
+# Moiré sums over the rfft2 half-plane (_MOIRE_SIZE × _MOIRE_SIZE//2 + 1, DC at
+# [0, 0]), as two weight vectors: columns 1..N/2-1 stand in for their Hermitian
+# mirror and count twice, DC / Nyquist columns once, and the DC bin not at all.
+# _MOIRE_HIGH_W additionally zeroes the low-frequency disc (radius 15).
+def _moire_weights() -> tuple[np.ndarray, np.ndarray]:
+    fy = np.fft.fftfreq(_MOIRE_SIZE, 1 / _MOIRE_SIZE)[:, None]
+    fx = np.fft.rfftfreq(_MOIRE_SIZE, 1 / _MOIRE_SIZE)[None, :]
+    total = np.full((fy.size, fx.size), 2.0, dtype=np.float32)
+    total[:, 0] = total[:, -1] = 1.0
+    total[0, 0] = 0.0
+    high = np.where(np.hypot(fy, fx) <= 15, 0.0, total).astype(np.float32)
+    return total.ravel(), high.ravel()
+
+
+_MOIRE_TOTAL_W, _MOIRE_HIGH_W = _moire_weights()
+
+# Per-thread scratch buffers for the fixed-size anti-spoof stages — reused
+# across requests instead of allocating fresh arrays per login
+_scratch = threading.local()
+
+
+def _buffer(name: str, shape: tuple[int, ...], dtype) -> np.ndarray:
+    buf = getattr(_scratch, name, None)
+    if buf is None:
+        buf = np.empty(shape, dtype=dtype)
+        setattr(_scratch, name, buf)
+    return buf
+
+
+if njit is not None:
+    @njit(cache=True, boundscheck=False)
+    def _lbp_hist(face):
+        """256-bin LBP histogram — codes and counts in a single pass over the crop."""
+        h, w = face.shape
+        hist = np.zeros(256, np.int64)
+        for y in range(1, h - 1):
+            for x in range(1, w - 1):
+                c = face[y, x]
+                code = (
+                    (np.int64(face[y - 1, x - 1] >= c))
+                    | (np.int64(face[y - 1, x] >= c) << 1)
+                    | (np.int64(face[y - 1, x + 1] >= c) << 2)
+                    | (np.int64(face[y, x + 1] >= c) << 3)
+                    | (np.int64(face[y + 1, x + 1] >= c) << 4)
+                    | (np.int64(face[y + 1, x] >= c) << 5)
+                    | (np.int64(face[y + 1, x - 1] >= c) << 6)
+                    | (np.int64(face[y, x - 1] >= c) << 7)
+                )
+                hist[code] += 1
+        return hist
+else:
+    def _lbp_hist(face):
+        """Expects a _LBP_SIZE × _LBP_SIZE crop (see _LBP_WINDOWS)."""
+        center = face[1:-1, 1:-1]
+        # One uint8 compare per neighbour into an (8, H-2, W-2) bool stack, then
+        # a single C-level packbits folds the planes into codes (plane i → bit i)
+        bits = _buffer("lbp_bits", (8,) + center.shape, bool)
+        for i, window in enumerate(_LBP_WINDOWS):
+            np.greater_equal(face[window], center, out=bits[i])
+        lbp = np.packbits(bits, axis=0, bitorder="little")[0]
+        # OpenCV's SIMD histogram releases the GIL (frames run on _POOL threads)
+        return cv2.calcHist([lbp], [0], None, [256], [0, 256]).ravel()
+
+
+def _lbp_entropy(face128: np.ndarray) -> float:
     """
-    Local Binary Pattern histogram entropy of the face region.
+    Local Binary Pattern histogram entropy of the (shared 128×128) face crop.
     Real skin has rich micro-texture → diverse LBP codes → high entropy.
     Screen/print reproductions have smoother / regular texture → lower entropy.
-    ~3 ms on a 96×96 crop.
+    ~3 ms on a 96×96 crop (NumPy); well under 1 ms with the Numba kernel.
     """
-    face = cv2.resize(gray_face, (96, 96))
-    h, w = face.shape
-    center = face[1:-1, 1:-1].astype(np.int16)
-    lbp = np.zeros_like(center, dtype=np.uint8)
-    for bit, (dy, dx) in enumerate(
-        [(-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1)]
-    ):
-        nb = face[1 + dy : h - 1 + dy, 1 + dx : w - 1 + dx].astype(np.int16)
-        lbp |= ((nb >= center).astype(np.uint8) << bit)
-    hist = np.bincount(lbp.ravel(), minlength=256).astype(np.float64)
+    # LBP_ENTROPY_MIN is calibrated at 96×96 — LBP codes are scale-dependent
+    face = _buffer("face96", (_LBP_SIZE, _LBP_SIZE), np.uint8)
+    cv2.resize(face128, (_LBP_SIZE, _LBP_SIZE), dst=face, interpolation=cv2.INTER_AREA)
+    hist = _lbp_hist(face).astype(np.float64)
     hist /= hist.sum() + 1e-10
     nz = hist[hist > 0]
     return float(-np.sum(nz * np.log2(nz)))
 
 
-def _moire_ratio(gray_face: np.ndarray) -> float:
+# Optional FFTW plan for the fixed _MOIRE_SIZE real FFT, built once
+# (FFTW_MEASURE) on first use. Its aligned in/out arrays are shared, so
+# running the plan and reading its output happen under _fftw_lock.
+_fftw_lock = threading.Lock()
+_fftw_plan = None
+
+
+def _get_fftw_plan():
+    global _fftw_plan
+    if _fftw_plan is None:
+        with _fftw_lock:
+            if _fftw_plan is None:
+                n = _MOIRE_SIZE
+                src = pyfftw.empty_aligned((n, n), dtype="float32")
+                dst = pyfftw.empty_aligned((n, n // 2 + 1), dtype="complex64")
+                _fftw_plan = pyfftw.FFTW(
+                    src, dst, axes=(0, 1),
+                    flags=("FFTW_MEASURE", "FFTW_DESTROY_INPUT"), threads=1,
+                )
+    return _fftw_plan
+
+
+def _spectrum_power(spec: np.ndarray, power: np.ndarray, tmp: np.ndarray) -> None:
+    """power = re² + im² (no sqrt / log), without temporaries."""
+    np.square(spec.real, out=power, casting="same_kind")
+    np.square(spec.imag, out=tmp, casting="same_kind")
+    power += tmp
+
+
+def _moire_ratio(face128: np.ndarray) -> float:
     """
-    High-frequency energy ratio via 2D FFT.
+    High-frequency share of AC power via 2D FFT.
     Screen photographs contain moiré patterns from camera-sensor / display-pixel
     interference, pushing energy into high-frequency bands.
     ~1 ms on a 128×128 crop.
     """
-    face = cv2.resize(gray_face, (128, 128)).astype(np.float32)
-    mag = np.log(np.abs(np.fft.fftshift(np.fft.fft2(face))) + 1)
-    h, w = mag.shape
-    Y, X = np.ogrid[:h, :w]
-    dist = np.sqrt((X - w // 2) ** 2 + (Y - h // 2) ** 2)
-    total = mag.sum()
+    # Real input → non-redundant half-spectrum
+    shape = (_MOIRE_SIZE, _MOIRE_SIZE // 2 + 1)
+    power = _buffer("power", shape, np.float32)
+    tmp = _buffer("power_tmp", shape, np.float32)
+    if pyfftw is not None:
+        plan = _get_fftw_plan()
+        with _fftw_lock:
+            np.copyto(plan.input_array, face128)
+            _spectrum_power(plan(), power, tmp)
+    else:
+        face = _buffer("face128_f32", (_MOIRE_SIZE, _MOIRE_SIZE), np.float32)
+        np.copyto(face, face128)
+        _spectrum_power(np.fft.rfft2(face), power, tmp)
+    power = power.ravel()
+    # DC is weighted out so mean brightness doesn't swamp the ratio
+    total = float(power @ _MOIRE_TOTAL_W)
     if total < 1e-10:
         return 0.0
-    low = mag[dist <= 15].sum()
-    return float((total - low) / total)
+    return float(power @ _MOIRE_HIGH_W) / total
 
 
 def _skin_cr_var(img_bgr: np.ndarray, rect: tuple) -> float:
@@ -111,45 +264,97 @@ def _skin_cr_var(img_bgr: np.ndarray, rect: tuple) -> float:
     Variance of the Cr channel in the face ROI (YCrCb space).
     Real skin has natural chrominance variation from blood flow, shadows, etc.
     Screen-reproduced faces have flatter, more uniform chrominance.
-    ~0.5 ms.
+    Full-resolution ROI, Cr row only (no 3-channel YCrCb write). ~0.2 ms.
     """
     x, y, fw, fh = rect
     roi = img_bgr[y : y + fh, x : x + fw]
     if roi.size == 0:
         return 100.0
-    cr = cv2.cvtColor(roi, cv2.COLOR_BGR2YCrCb)[:, :, 1].astype(np.float64)
-    return float(np.var(cr))
+    cr = cv2.transform(roi, _CR_FROM_BGR)   # uint8, rounded like cvtColor
+    _, std = cv2.meanStdDev(cr)
+    return float(std[0, 0] ** 2)
+
+
+_ANTISPOOF_SIGNALS = 4    # Cr, LBP, moiré, depth
+_ANTISPOOF_FAILS   = 2    # fail the login at this many triggered signals
 
 
 def _antispoof(img, gray, rect):
-    """Run all anti-spoof signals on one frame. Returns list of (name, failed, value)."""
+    """
+    Lazily yield anti-spoof signals for one frame as (name, failed, detail),
+    cheapest first: Cr variance → LBP → moiré → MiDaS depth. The caller stops
+    iterating once the verdict is decided, so later signals (above all the
+    depth model) are only computed when they can still change it.
+    """
     x, y, fw, fh = rect
     gf = gray[y : y + fh, x : x + fw]
-    if gf.shape[0] < 30 or gf.shape[1] < 30:
-        return []  # face crop too small to analyse
+    if gf.shape[0] >= 30 and gf.shape[1] >= 30:  # else too small to analyse
+        cr_var = _skin_cr_var(img, rect)
+        yield "flat_colour", cr_var < SKIN_CR_VAR_MIN, f"Cr_var={cr_var:.1f}"
 
-    ent = _lbp_entropy(gf)
-    moire = _moire_ratio(gf)
-    cr_var = _skin_cr_var(img, rect)
+        # One area-averaged downsample shared by the LBP and moiré signals
+        face128 = _buffer("face128", (_MOIRE_SIZE, _MOIRE_SIZE), np.uint8)
+        cv2.resize(gf, (_MOIRE_SIZE, _MOIRE_SIZE), dst=face128, interpolation=cv2.INTER_AREA)
+        ent = _lbp_entropy(face128)
+        yield "texture", ent < LBP_ENTROPY_MIN, f"entropy={ent:.2f}"
 
-    logger.info(
-        "Anti-spoof signals — LBP_entropy=%.2f  moiré=%.3f  Cr_var=%.1f",
-        ent, moire, cr_var,
-    )
+        moire = _moire_ratio(face128)
+        yield "screen_pattern", moire > MOIRE_RATIO_MAX, f"moiré={moire:.3f}"
 
-    return [
-        ("texture", ent < LBP_ENTROPY_MIN, f"entropy={ent:.2f}"),
-        ("screen_pattern", moire > MOIRE_RATIO_MAX, f"moiré={moire:.3f}"),
-        ("flat_colour", cr_var < SKIN_CR_VAR_MIN, f"Cr_var={cr_var:.1f}"),
-    ]
+    from app.services.depth_check import check_depth
+    depth_passed, d_range, d_std = check_depth(img, rect)
+    if d_range > 0:  # model was available
+        yield "flat_depth", not depth_passed, f"range={d_range:.1f} std={d_std:.1f}"
+
+
+def _prep(img: np.ndarray | None):
+    """Per-frame work for a sequence: (img, gray, blur, YuNet rows or None), or None if unusable."""
+    if img is None:
+        return None
+    # Frames arrive decoded once as BGR and are shared with embedding
+    # extraction (YuNet + SFace need colour for every frame), so a separate
+    # grayscale decode here would add a JPEG decode rather than save one
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    b = _blur(gray)
+    if b < BLUR_MIN_SEQ:
+        return None
+    return img, gray, b, fr.detect_faces(img)
 
 
 # ── Public API ─────────────────────────────────────────────────────────────────
 
-def check_liveness_single(image_bytes: bytes) -> LivenessResult:
+def warmup() -> None:
+    """
+    Compile the JIT kernels, plan the FFT and start every _POOL worker with
+    its own YuNet detector up front, so the first login isn't penalised.
+    Detectors on asyncio.to_thread workers (enrollment) are still created on
+    first use.
+    """
+    _lbp_hist(np.zeros((_LBP_SIZE, _LBP_SIZE), dtype=np.uint8))
+    if pyfftw is not None:
+        _get_fftw_plan()
+    if not (fr.YUNET_PATH.exists() and fr.SFACE_PATH.exists()):
+        return  # fr.warmup() has already warned
+
+    # The barrier holds each task until all workers are running, so every
+    # one of them lands on a different thread
+    barrier = threading.Barrier(_POOL_WORKERS)
+    blank = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def warm_worker():
+        barrier.wait(timeout=30)
+        fr.detect_faces(blank)
+
+    try:
+        for f in [_POOL.submit(warm_worker) for _ in range(_POOL_WORKERS)]:
+            f.result()
+    except threading.BrokenBarrierError:
+        logger.warning("Liveness pool warm-up timed out — detectors load on first use")
+
+
+def check_liveness_single(img: np.ndarray | None) -> LivenessResult:
     """Single-frame check for enrollment — only verifies image quality + face presence.
     Anti-spoof is NOT run here; it's enforced during login instead."""
-    img = _decode(image_bytes)
     if img is None:
         return LivenessResult(False, "Could not decode image")
 
@@ -162,39 +367,36 @@ def check_liveness_single(image_bytes: bytes) -> LivenessResult:
             blur_score=blur,
         )
 
-    cascade = _cascade()
-    rect = _find_face(cascade, gray)
+    rect = _find_face(img)
     if rect is None:
         return LivenessResult(False, "No face detected", blur_score=blur)
 
     return LivenessResult(True, "OK", blur_score=blur)
 
 
-def check_liveness_sequence(frames_bytes: list[bytes]) -> LivenessResult:
+def check_liveness_sequence(frames: list[np.ndarray | None]) -> LivenessResult:
     """
-    Multi-frame liveness for login.
+    Multi-frame liveness for login. Frames are decoded BGR images
+    (None for frames that failed to decode).
     Combines anti-spoof scoring with motion analysis.
     Total server processing: < 50 ms for 3–4 frames.
     """
-    if len(frames_bytes) < 2:
+    if len(frames) < 2:
         return LivenessResult(False, "Not enough frames")
 
     grays, imgs, blurs = [], [], []
-    face_rects = []
-    cascade = _cascade()
+    face_rects, detections = [], []
 
-    for fb in frames_bytes:
-        img = _decode(fb)
-        if img is None:
-            continue
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        b = _blur(gray)
-        if b < BLUR_MIN_SEQ:
+    for prepped in _POOL.map(_prep, frames):
+        if prepped is None:
             continue
+        img, gray, b, faces = prepped
         grays.append(gray)
         imgs.append(img)
         blurs.append(b)
-        face_rects.append(_find_face(cascade, gray))
+        face_rects.append(_face_rect(faces, img.shape))
+        if faces is not None:
+            detections.append((img, faces[int(np.argmax(faces[:, -1]))]))
 
     if len(grays) < 2:
         return LivenessResult(False, "Not enough usable frames")
@@ -203,22 +405,22 @@ def check_liveness_sequence(frames_bytes: list[bytes]) -> LivenessResult:
     if not valid_faces:
         return LivenessResult(False, "No face detected in frames")
 
-    # ── Anti-spoof on sharpest frame ───────────────────────────────────────
+    # ── Anti-spoof on sharpest frame (incl. MiDaS depth) ──────────────────
     best = int(np.argmax(blurs))
     rect = face_rects[best] if face_rects[best] is not None else valid_faces[0]
 
-    signals = _antispoof(imgs[best], grays[best], rect)
+    signals, fail_count = [], 0
+    for signal in _antispoof(imgs[best], grays[best], rect):
+        signals.append(signal)
+        fail_count += signal[1]
+        remaining = _ANTISPOOF_SIGNALS - len(signals)
+        if fail_count >= _ANTISPOOF_FAILS or fail_count + remaining < _ANTISPOOF_FAILS:
+            break  # verdict can no longer change
 
-    # ── Depth check (MiDaS) on sharpest frame ─────────────────────────────
-    from app.services.depth_check import check_depth
-    depth_passed, d_range, d_std = check_depth(imgs[best], rect)
-    if d_range > 0:  # model was available
-        signals.append(("flat_depth", not depth_passed, f"range={d_range:.1f} std={d_std:.1f}"))
-
-    fail_count = sum(1 for _, failed, _ in signals if failed)
+    logger.info("Anti-spoof signals — %s", "  ".join(d for _, _, d in signals))
     fail_reasons = [f"{n}({d})" for n, failed, d in signals if failed]
 
-    if fail_count >= 2:
+    if fail_count >= _ANTISPOOF_FAILS:
         return LivenessResult(
             False,
             f"Anti-spoof failed: {', '.join(fail_reasons)}",
@@ -226,9 +428,18 @@ def check_liveness_sequence(frames_bytes: list[bytes]) -> LivenessResult:
         )
 
     # ── Motion analysis ────────────────────────────────────────────────────
+    # Face ROI of the sharpest frame in every frame, area-decimated 4× — the
+    # background contributes no liveness signal, and averaging suppresses
+    # sensor noise that would otherwise read as motion on a static replay
+    x, y, fw, fh = rect
+    dsize = (max(fw // 4, 1), max(fh // 4, 1))   # clipped rects can be < 4 px
+    small = [
+        cv2.resize(g[y : y + fh, x : x + fw], dsize, interpolation=cv2.INTER_AREA)
+        for g in grays
+    ]
     motions = [
-        float(cv2.absdiff(grays[i - 1], grays[i]).mean())
-        for i in range(1, len(grays))
+        cv2.norm(small[i - 1], small[i], cv2.NORM_L1) / small[i].size  # fused absdiff + mean
+        for i in range(1, len(small))
     ]
     avg_motion = float(np.mean(motions))
 
@@ -245,4 +456,5 @@ def check_liveness_sequence(frames_bytes: list[bytes]) -> LivenessResult:
         "OK",
         blur_score=float(np.mean(blurs)),
         motion_score=avg_motion,
+        detections=detections,
     )
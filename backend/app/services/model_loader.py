@@ -6,32 +6,59 @@ Models:
   SFace face recognizer — 37 MB   (face_recognition_sface.onnx)
 
 Both from the official OpenCV model zoo (reliable GitHub LFS).
-Run standalone: python3 download_models.py
+With SFACE_INT8 set, SFace's fully-connected layers are additionally
+quantised to INT8 (face_recognition_sface_int8.onnx) once it is on disk —
+this needs the `onnx` package, which is not a runtime requirement.
+Downloads run in parallel, resume from a `.part` file via HTTP Range, and
+are renamed into place only once complete and SHA-256 verified; a model
+with no known digest is refused unless ALLOW_UNVERIFIED_MODELS is set. Run
+standalone: python3 download_models.py
 """
+import hashlib
 import logging
-import urllib.request
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
+import numpy as np
+import requests
+
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 MODELS_DIR = Path(__file__).parent.parent.parent / "models"
+SFACE_INT8_NAME = "face_recognition_sface_int8.onnx"
+
+_CHUNK = 1 << 20   # 1 MiB copy/hash blocks; progress is logged once per block
+
+_ZOO_MEDIA = "https://media.githubusercontent.com/media/opencv/opencv_zoo/main"
+_ZOO_RAW   = "https://raw.githubusercontent.com/opencv/opencv_zoo/main"
 
+# Expected SHA-256 of each file, checked before it is moved into place:
+#   "sha256"      — pinned hex digest; takes precedence when set
+#   "lfs_pointer" — Git LFS pointer for the file in the upstream repo, whose
+#                   "oid sha256:<hex>" line is the digest of the LFS object
+#   "release_api" — GitHub release whose asset (matched on the URL's file
+#                   name) carries a "digest": "sha256:<hex>" field
+# With none of them the download is refused unless ALLOW_UNVERIFIED_MODELS.
+# download_models.py prints each file's digest, for pinning in "sha256".
 MODELS = [
     {
         "name": "face_detection_yunet.onnx",
-        "url": (
-            "https://media.githubusercontent.com/media/opencv/opencv_zoo/main"
-            "/models/face_detection_yunet/face_detection_yunet_2023mar.onnx"
-        ),
+        "url": f"{_ZOO_MEDIA}/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+        "lfs_pointer": f"{_ZOO_RAW}/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
         "desc": "YuNet face detector (228 KB)",
+        "sha256": None,
     },
     {
         "name": "face_recognition_sface.onnx",
-        "url": (
-            "https://media.githubusercontent.com/media/opencv/opencv_zoo/main"
-            "/models/face_recognition_sface/face_recognition_sface_2021dec.onnx"
-        ),
+        "url": f"{_ZOO_MEDIA}/models/face_recognition_sface/face_recognition_sface_2021dec.onnx",
+        "lfs_pointer": f"{_ZOO_RAW}/models/face_recognition_sface/face_recognition_sface_2021dec.onnx",
         "desc": "SFace face recognizer (37 MB)",
+        "sha256": None,
     },
     {
         "name": "midas_small.onnx",
@@ -39,42 +66,191 @@ MODELS = [
             "https://github.com/isl-org/MiDaS/releases/download/v2_1"
             "/model-small.onnx"
         ),
+        "release_api": "https://api.github.com/repos/isl-org/MiDaS/releases/tags/v2_1",
         "desc": "MiDaS-small depth estimator (64 MB)",
+        "sha256": None,
     },
 ]
 
 
 def ensure_models() -> None:
-    """Download any missing models. No-op if both exist."""
+    """Download any missing models (in parallel). No-op if all exist."""
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    missing = []
     for m in MODELS:
         path = MODELS_DIR / m["name"]
         if path.exists() and path.stat().st_size > 10_000:
             logger.info("Model present: %s", m["name"])
-            continue
-        logger.info("Downloading %s from %s …", m["desc"], m["url"])
-        try:
-            _download(m["url"], path)
-            logger.info("✅  %s  (%.1f MB)", m["name"], path.stat().st_size / 1e6)
-        except Exception as e:
-            if path.exists():
-                path.unlink()
-            raise RuntimeError(f"Failed to download {m['name']}: {e}") from e
-
-
-def _download(url: str, dest: Path) -> None:
-    req = urllib.request.Request(url, headers={"User-Agent": "FaceReg/1.0"})
-    with urllib.request.urlopen(req, timeout=120) as resp:
-        total = int(resp.headers.get("Content-Length", 0))
-        downloaded = 0
-        with open(dest, "wb") as f:
-            while chunk := resp.read(65536):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total:
-                    print(
-                        f"\r  {downloaded / total * 100:.0f}%  "
-                        f"({downloaded // 1024} / {total // 1024} KB)",
-                        end="", flush=True,
-                    )
-    print()
+        else:
+            missing.append(m)
+    if missing:
+        with requests.Session() as http, ThreadPoolExecutor(max_workers=3) as pool:
+            http.headers["User-Agent"] = "FaceReg/1.0"
+            # list() re-raises the first failure after all downloads settle
+            list(pool.map(partial(_fetch, http), missing))
+    if settings.SFACE_INT8:
+        quantize_sface()
+
+
+def _fetch(http: requests.Session, m: dict) -> None:
+    path = MODELS_DIR / m["name"]
+    logger.info("Downloading %s from %s …", m["desc"], m["url"])
+    try:
+        sha256 = _expected_sha256(http, m)
+        if sha256 is None:
+            if not settings.ALLOW_UNVERIFIED_MODELS:
+                raise RuntimeError(
+                    "no SHA-256 known — pin it in MODELS or set ALLOW_UNVERIFIED_MODELS=true"
+                )
+            logger.warning("No SHA-256 known for %s — download will not be verified", m["name"])
+        _download(http, m["url"], path, sha256)
+    except Exception as e:
+        raise RuntimeError(f"Failed to download {m['name']}: {e}") from e
+    logger.info("✅  %s  (%.1f MB)", m["name"], path.stat().st_size / 1e6)
+
+
+def _expected_sha256(http: requests.Session, m: dict) -> str | None:
+    if m.get("sha256"):
+        return m["sha256"]
+    if m.get("release_api"):
+        return _release_asset_sha256(http, m["release_api"], m["url"].rsplit("/", 1)[-1])
+    if not m.get("lfs_pointer"):
+        return None
+    resp = http.get(m["lfs_pointer"], timeout=30)
+    resp.raise_for_status()
+    for line in resp.text.splitlines():
+        if line.startswith("oid sha256:"):
+            return line.split(":", 1)[1].strip()
+    raise RuntimeError(f"No sha256 oid in LFS pointer {m['lfs_pointer']}")
+
+
+def _release_asset_sha256(http: requests.Session, api_url: str, asset: str) -> str | None:
+    """Digest GitHub records for a release asset; None for assets predating the field."""
+    resp = http.get(api_url, headers={"Accept": "application/vnd.github+json"}, timeout=30)
+    resp.raise_for_status()
+    for a in resp.json().get("assets", []):
+        if a.get("name") == asset:
+            digest = a.get("digest") or ""
+            return digest.split(":", 1)[1] if digest.startswith("sha256:") else None
+    raise RuntimeError(f"No asset {asset} in release {api_url}")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def quantize_sface() -> None:
+    """
+    Write an INT8 dynamic-quantised copy of SFace. No-op if it already exists.
+    Only the fully-connected layers are quantised: dynamic quantisation of
+    convolutions yields ConvInteger / DynamicQuantizeLinear nodes, which the
+    ORT CPU provider runs several times slower than the FP32 convs.
+    """
+    src = MODELS_DIR / "face_recognition_sface.onnx"
+    dst = MODELS_DIR / SFACE_INT8_NAME
+    if dst.exists() or not src.exists():
+        return
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise RuntimeError(f"SFACE_INT8 needs the onnx package (pip install onnx): {e}") from e
+    logger.info("Quantising SFace to INT8 …")
+    try:
+        quantize_dynamic(
+            str(src), str(dst),
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=["MatMul", "Gemm"],
+        )
+    except Exception as e:
+        if dst.exists():
+            dst.unlink()
+        raise RuntimeError(f"Failed to quantise SFace: {e}") from e
+    logger.info("✅  %s  (%.1f MB)", SFACE_INT8_NAME, dst.stat().st_size / 1e6)
+
+
+class _HashingWriter:
+    """File wrapper for shutil.copyfileobj: hashes each block, logs progress per MiB."""
+
+    def __init__(self, f, digest, name: str, done: int, total: int):
+        self._f, self._digest, self._name = f, digest, name
+        self.done, self._total = done, total
+        self._next_report = done + _CHUNK
+
+    def write(self, block: bytes) -> None:
+        self._f.write(block)
+        self._digest.update(block)
+        self.done += len(block)
+        if self.done >= self._next_report:
+            self._next_report = self.done + _CHUNK
+            if self._total:
+                logger.info("  %s  %.0f%%  (%d / %d MB)", self._name,
+                            self.done / self._total * 100, self.done >> 20, self._total >> 20)
+            else:
+                logger.info("  %s  %d MB", self._name, self.done >> 20)
+
+
+def _download(http: requests.Session, url: str, dest: Path, sha256: str | None = None) -> None:
+    """
+    Stream `url` into `dest.part`, resuming a previous partial download via
+    HTTP Range, then atomically rename to `dest`. A hash mismatch discards
+    the partial file so the next attempt starts clean.
+    """
+    part = dest.with_suffix(dest.suffix + ".part")
+    digest = hashlib.sha256()
+    offset = 0
+    if part.exists():
+        with open(part, "rb") as f:
+            while chunk := f.read(_CHUNK):
+                digest.update(chunk)
+                offset += len(chunk)
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with http.get(url, headers=headers, stream=True, timeout=120) as resp:
+        # 416: .part already holds the whole file
+        if not (offset and resp.status_code == 416):
+            resp.raise_for_status()
+            if offset and resp.status_code != 206:
+                # Server ignored the Range header — start over
+                digest, offset = hashlib.sha256(), 0
+            total = offset + int(resp.headers.get("Content-Length", 0))
+            resp.raw.decode_content = True
+            with open(part, "ab" if offset else "wb") as f:
+                writer = _HashingWriter(f, digest, dest.name, offset, total)
+                shutil.copyfileobj(resp.raw, writer, length=_CHUNK)
+
+    if sha256 is not None and digest.hexdigest() != sha256:
+        part.unlink(missing_ok=True)
+        raise RuntimeError(f"SHA-256 mismatch (got {digest.hexdigest()})")
+    os.replace(part, dest)
+
+
+# ── ONNXRuntime sessions ───────────────────────────────────────────────────────
+
+def create_session(path: Path):
+    """CPU InferenceSession with full graph optimisation and memory-pattern reuse."""
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    # Fixed up front so the first inference doesn't size the thread pool
+    opts.intra_op_num_threads = settings.ORT_INTRA_OP_THREADS or os.cpu_count() or 1
+    opts.enable_mem_pattern = True
+    return ort.InferenceSession(
+        str(path),
+        sess_options=opts,
+        providers=["CPUExecutionProvider"],
+    )
+
+
+def run_bound(session, input_name: str, output_name: str, blob: np.ndarray) -> np.ndarray:
+    """Run a single-input/single-output session via IOBinding (no input copy)."""
+    binding = session.io_binding()
+    binding.bind_cpu_input(input_name, np.ascontiguousarray(blob))
+    binding.bind_output(output_name)
+    session.run_with_iobinding(binding)
+    return binding.copy_outputs_to_cpu()[0]
+
@@ -10,15 +10,16 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 
-from app.services.model_loader import ensure_models, MODELS_DIR, MODELS
+from app.services.model_loader import ensure_models, file_sha256, MODELS_DIR, MODELS, SFACE_INT8_NAME
 
 if __name__ == "__main__":
     try:
         ensure_models()
         print("\n✅ All models ready:")
-        for m in MODELS:
-            p = MODELS_DIR / m["name"]
-            print(f"   {m['name']:45s} {p.stat().st_size / 1e6:6.1f} MB")
+        for name in [m["name"] for m in MODELS] + [SFACE_INT8_NAME]:
+            p = MODELS_DIR / name
+            if p.exists():
+                print(f"   {name:45s} {p.stat().st_size / 1e6:6.1f} MB  sha256:{file_sha256(p)}")
     except RuntimeError as e:
         print(f"\n❌ {e}")
         sys.exit(1)